@@ -0,0 +1,75 @@
+"""_vmedata.pyx
+
+This module contains a compiled decoder for the ADC frames in VME files. It is used by :mod:`pytpc.vmedata`
+to parse each frame in a single call.
+
+"""
+
+cdef Py_ssize_t _adc_body_len = 12 + 2 * (16 + 2048)  # event header, then registers and raw words for 2 ADCs
+
+
+cdef inline unsigned int _word(const unsigned char* p) noexcept nogil:
+    """Read a little-endian 32-bit word starting at `p`."""
+    return p[0] | (p[1] << 8) | (p[2] << 16) | (<unsigned int> p[3] << 24)
+
+
+cdef void _unpack_block(const unsigned char* raw, unsigned int last_tb, unsigned short* hi,
+                        unsigned short* lo) noexcept nogil:
+    """Unpack one ADC block of 512 raw words into the two channels `hi` and `lo`."""
+    cdef Py_ssize_t i
+    cdef unsigned int r
+    for i in range(512):
+        r = _word(raw + 4 * ((i + last_tb) % 512))
+        hi[i] = (r >> 16) & 0x1fff
+        lo[i] = r & 0x1fff
+
+
+def decode_adc_frame(const unsigned char[::1] buf, Py_ssize_t start, unsigned short[:, ::1] out):
+    """Decode the body of an ADC frame.
+
+    This is a compiled version of ``pytpc.vmedata._decode_adc_frame``. It reads the event header and the
+    address-of-end-of-event register of each ADC block, and unpacks the raw words of both blocks into four
+    channels of samples.
+
+    Parameters
+    ----------
+    buf : bytes-like
+        The buffer holding the frame.
+    start : int
+        The offset in `buf` of the start of the frame body, just after the magic word.
+    out : ndarray
+        A C-contiguous uint16 array of shape ``(4, 512)`` to write the samples into.
+
+    Returns
+    -------
+    evtnum, timestamp, coinreg : int
+        The frame index, time stamp, and coincidence register from the event header.
+    last_tb1, last_tb2 : int
+        The last time bucket written in each ADC block.
+
+    Raises
+    ------
+    ValueError
+        If `buf` is too short to hold the frame body, or if `out` has the wrong shape.
+
+    """
+    if start < 0 or start + _adc_body_len > buf.shape[0]:
+        raise ValueError('Buffer is too short to hold an ADC frame')
+    if out.shape[0] != 4 or out.shape[1] != 512:
+        raise ValueError('Output array must have shape (4, 512)')
+
+    # The bounds were checked above, so the rest can work with pointers
+    cdef const unsigned char* body = &buf[start]
+    cdef unsigned short* samples = &out[0, 0]
+    cdef unsigned int evtnum, timestamp, coinreg, last_tb1, last_tb2
+    with nogil:
+        evtnum = _word(body)
+        timestamp = _word(body + 4)
+        coinreg = _word(body + 8)
+        last_tb1 = _word(body + 24) & 0x1ffff
+        last_tb2 = _word(body + 2088) & 0x1ffff
+
+        _unpack_block(body + 28, last_tb1, samples, samples + 512)
+        _unpack_block(body + 2092, last_tb2, samples + 1024, samples + 1536)
+
+    return evtnum, timestamp, coinreg, last_tb1, last_tb2
@@ -3,7 +3,7 @@ import numpy as np
 
 from pytpc.constants import *
 import pytpc.relativity as rel
-from numpy import log, exp
+from numpy import log, log1p, exp
 from scipy.interpolate import InterpolatedUnivariateSpline
 import pandas as pd
 import sqlite3
@@ -572,6 +572,10 @@ class HeCO2Gas(GenericGas):
         return result
 
 
+_bethe_prefactor = e_chg**4 / (e_mc2 * MeVtokg * c_lgt**2 * 4 * pi * eps_0**2) / e_chg * 1e-6
+"""The part of the Bethe formula's prefactor that depends on neither the gas nor the projectile, in MeV/m."""
+
+
 def bethe(beta, z, ne, exc_en):
     """ Find the stopping power of the gas.
 
@@ -600,10 +604,10 @@ def bethe(beta, z, ne, exc_en):
         dedx = float('inf')
     elif beta_sq == 1.0:
         # This is odd, but then I guess dedx -> 0
-        dedx = 0
+        dedx = 0.0
     else:
-        frnt = ne * z**2 * e_chg**4 / (e_mc2 * MeVtokg * c_lgt**2 * beta_sq * 4 * pi * eps_0**2)
-        lnt = log(2 * e_mc2 * beta_sq / (exc_en * (1 - beta_sq)))
-        dedx = frnt*(lnt - beta_sq)  # this should be in SI units, J/m
+        frnt = _bethe_prefactor * ne * z**2 / beta_sq
+        lnt = log(2 * e_mc2 * beta_sq / exc_en) - log1p(-beta_sq)  # the relativistic term, -log(1 - beta_sq)
+        dedx = frnt*(lnt - beta_sq)  # the prefactor already converts J/m -> MeV/m
 
-    return dedx / e_chg * 1e-6  # converted to MeV/m
+    return dedx
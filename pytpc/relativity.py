@@ -7,7 +7,7 @@ This module contains functions to calculate quantities of interest in special re
 from __future__ import division, print_function
 import numpy as np
 from pytpc.constants import c_lgt, pi
-from math import sqrt
+from math import sqrt, hypot
 
 
 def gamma(v):
@@ -25,7 +25,10 @@ def gamma(v):
     ValueError
         If the magnitude of `v` is greater than the speed of light.
     """
-    vmag = np.linalg.norm(v)
+    if isinstance(v, np.ndarray) and v.ndim == 1:
+        vmag = hypot(*v.tolist())  # for a single short vector, this is much cheaper than np.linalg.norm
+    else:
+        vmag = np.linalg.norm(v)
     if vmag >= c_lgt:
         raise ValueError('Velocity was {}, which exceeds c.'.format(vmag))
     return 1 / sqrt(1 - vmag**2 / c_lgt**2)
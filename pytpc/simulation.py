@@ -8,11 +8,10 @@ Contains code for simulating the tracking of particles in a TPC.
 
 from __future__ import division, print_function
 import numpy as np
-from math import sin, cos
 from .constants import e_chg, pi, eps_0
 
 
-def lorentz(vel, ef, bf, charge):
+def lorentz(vel, ef, bf, charge, out=None):
     """Calculate the Lorentz (electromagnetic) force.
 
     This is defined as
@@ -33,11 +32,13 @@ def lorentz(vel, ef, bf, charge):
         The magnetic field
     charge : float or int
         The charge of the particle
+    out : ndarray, optional
+        A length-3 array to write the result into. If this is provided, no new array is allocated.
 
     Returns
     -------
     force : array-like
-        The electromagnetic force, in whatever units the inputs generate
+        The electromagnetic force, in whatever units the inputs generate. If `out` was given, this is `out`.
     """
 
     vx, vy, vz = vel
@@ -48,7 +49,13 @@ def lorentz(vel, ef, bf, charge):
     fy = charge * (ey + vz * bx - vx * bz)
     fz = charge * (ez + vx * by - vy * bx)
 
-    return np.array([fx, fy, fz])
+    if out is None:
+        return np.array([fx, fy, fz])
+
+    out[0] = fx
+    out[1] = fy
+    out[2] = fz
+    return out
 
 
 def threshold(value, threshmin=0.):
@@ -75,21 +82,24 @@ def drift_velocity_vector(vd, efield, bfield, tilt):
 
     This includes the effects due to the Lorentz angle from the non-parallel electric and magnetic fields.
 
+    Any parameter may be an ndarray; broadcasting applies.
+
     Parameters
     ----------
-    vd : number
+    vd : number or array-like
         The drift velocity, in cm/us.
-    efield : number
+    efield : number or array-like
         The electric field magnitude, in SI units.
-    bfield : number
+    bfield : number or array-like
         The magnetic field magnitude, in Tesla.
-    tilt : number
+    tilt : number or array-like
         The angle between the electric and magnetic fields, in radians.
 
     Returns
     -------
     ndarray
-        The drift velocity vector
+        The drift velocity vector. This has shape ``(..., 3)``, where ``...`` is the broadcast shape of the
+        inputs, so scalar inputs give a single vector of shape ``(3,)``.
 
     Notes
     -----
@@ -123,11 +133,14 @@ def drift_velocity_vector(vd, efield, bfield, tilt):
 
     front = vd / (1 + ot**2)
 
-    xcomp = -front * ot * sin(tilt)
-    ycomp = front * ot**2 * cos(tilt) * sin(tilt)
-    zcomp = front * (1 + ot**2 * cos(tilt)**2)
+    sin_tilt = np.sin(tilt)
+    cos_tilt = np.cos(tilt)
+
+    xcomp = -front * ot * sin_tilt
+    ycomp = front * ot**2 * cos_tilt * sin_tilt
+    zcomp = front * (1 + ot**2 * cos_tilt**2)
 
-    return np.array([xcomp, ycomp, zcomp])  # in cm/us, as long as vd had the right units
+    return np.stack([xcomp, ycomp, zcomp], axis=-1)  # in cm/us, as long as vd had the right units
 
 
 def rutherford(angle, Z1, Z2, energy):
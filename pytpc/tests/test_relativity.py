@@ -31,6 +31,12 @@ class TestGamma(unittest.TestCase):
         exp = 1 / sqrt(1 + v**2 / c_lgt**2)
         self.assertAlmostEqual(rel.gamma(v), exp, places=4)
 
+    def test_with_2d_array(self):
+        v = numpy.array([[1e8, 0, 0]])
+        exp = 1 / sqrt(1 - 1e16 / c_lgt**2)
+        self.assertAlmostEqual(rel.gamma(v), exp)
+        self.assertAlmostEqual(rel.gamma([1e8, 0, 0]), exp)
+
 
 class TestBeta(unittest.TestCase):
     """Tests for relativity.beta function"""
@@ -38,6 +38,13 @@ class TestLorentz(unittest.TestCase):
     def test_scalar_vel(self):
         self.assertRaises(TypeError, self.do_test_values, vel=1, bf=1)
 
+    def test_out_param(self):
+        vel, ef, bf, charge = numpy.array((3e6, 4e4, 1e2)), numpy.array((0, 0, 1e6)), numpy.array((0, 0, -2)), 2*e_chg
+        out = numpy.empty(3)
+        res = sim.lorentz(vel, ef, bf, charge, out=out)
+        self.assertIs(res, out)
+        nptest.assert_allclose(out, charge*(ef + numpy.cross(vel, bf)))
+
 
 class TestThreshold(unittest.TestCase):
     """Tests for sim.threshold function"""
@@ -93,6 +100,13 @@ class TestDriftVelocityVector(unittest.TestCase):
         vdv = sim.drift_velocity_vector(self.vd, self.efield, self.bfield, self.tilt)
         self.assertEqual(vdv.shape, (3,))
 
+    def test_array_tilt(self):
+        tilts = numpy.linspace(0, pi/2, 5)
+        vdv = sim.drift_velocity_vector(self.vd, self.efield, self.bfield, tilts)
+        self.assertEqual(vdv.shape, (5, 3))
+        for tilt, v in zip(tilts, vdv):
+            nptest.assert_allclose(v, sim.drift_velocity_vector(self.vd, self.efield, self.bfield, tilt))
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,78 @@
+import unittest
+import numpy as np
+import numpy.testing as nptest
+import tempfile
+import os
+
+from pytpc.trigger.trigger import TriggerSimulator
+
+
+class TestTriggerSimulator(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        padmap_path = os.path.join(self.tmpdir.name, 'padmap.csv')
+
+        # Only even pad numbers are used, so the odd ones are missing from the pad map
+        self.padmap = {}
+        with open(padmap_path, 'w') as f:
+            for cobo in range(2):
+                for asad in range(4):
+                    for aget in range(4):
+                        for channel in range(68):
+                            if channel in (11, 22, 45, 56):
+                                continue  # FPN channels
+                            pad = 2 * len(self.padmap)
+                            self.padmap[(cobo, asad, aget, channel)] = pad
+                            f.write(f'{cobo},{asad},{aget},{channel},{pad}\n')
+
+        self.config = {
+            'padmap_path': padmap_path,
+            'clock': 12.5,
+            'pad_thresh_MSB': 0,
+            'pad_thresh_LSB': 1,
+            'trigger_discriminator_fraction': 0.017,
+            'trigger_signal_width': 80e-9,
+            'multiplicity_threshold': 2,
+            'multiplicity_window': 40,
+        }
+
+        rng = np.random.RandomState(42)
+        self.pads = rng.choice(list(self.padmap.values()), size=30, replace=False)
+        self.traces = rng.normal(0, 5, size=(len(self.pads), 512))
+        self.traces[::3, 100:140] += 100  # some pads over threshold
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_reverse_padmap_arr(self):
+        trig = TriggerSimulator(self.config)
+        arr = trig.reverse_padmap_arr
+
+        self.assertEqual(arr.shape, (max(self.padmap.values()) + 1, 4))
+        for key, pad in self.padmap.items():
+            nptest.assert_equal(arr[pad], key)
+        nptest.assert_equal(arr[1::2], -1)
+
+    def test_process_event_array(self):
+        rng = np.random.RandomState(0)
+        pedestals = list(rng.normal(0, 10, size=10240))
+        excluded_pads = self.pads[:5]
+
+        quiet_traces = np.zeros_like(self.traces)  # no pads over threshold, so this shouldn't trigger
+
+        for kwargs in ({}, {'excluded_pads': excluded_pads, 'pedestals': pedestals}, {'excluded_cobos': [1]}):
+            trig = TriggerSimulator(self.config, **kwargs)
+            for traces in (self.traces, quiet_traces):
+                exp_trig, exp_hits = trig.process_event(dict(zip(self.pads, traces)))
+                did_trig, hits = trig.process_event_array(self.pads, traces)
+
+                self.assertEqual(did_trig, exp_trig)
+                nptest.assert_equal(hits, exp_hits)
+
+        self.assertTrue(TriggerSimulator(self.config).process_event_array(self.pads, self.traces)[0])
+        self.assertFalse(TriggerSimulator(self.config).process_event_array(self.pads, quiet_traces)[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
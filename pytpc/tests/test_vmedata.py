@@ -0,0 +1,184 @@
+import unittest
+import numpy as np
+import numpy.testing as nptest
+import tempfile
+import struct
+import os
+
+import pytpc.vmedata as vmedata
+
+
+def make_scaler_frame(scalers):
+    return struct.pack('<HH', 0x2025, 0xe238) + np.asarray(scalers, dtype='<u4').tobytes() + struct.pack('<I', 0xffffffff)
+
+
+def make_adc_frame(frame_idx, timestamp, coinreg, raw1, raw2, last_tb):
+    reg = np.array([0, 0, 0, last_tb], dtype='<u4').tobytes()
+    return (struct.pack('<HHIII', 0x17fb, 0xe238, frame_idx, timestamp, coinreg)
+            + reg + np.asarray(raw1, dtype='<u4').tobytes()
+            + reg + np.asarray(raw2, dtype='<u4').tobytes())
+
+
+def expected_adc_data(raw1, raw2, last_tb):
+    raw1 = np.roll(raw1, -last_tb)
+    raw2 = np.roll(raw2, -last_tb)
+    return np.array([raw1 >> 16 & 0x1fff, raw1 & 0x1fff, raw2 >> 16 & 0x1fff, raw2 & 0x1fff])
+
+
+class TestVMEFile(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        self.scalers = rng.randint(0, 2**31, size=18)
+        self.raws = [(rng.randint(0, 2**31, size=512), rng.randint(0, 2**31, size=512)) for i in range(2)]
+        self.last_tbs = [12, 400]
+        self.timestamps = [1000, 2000]
+        self.coinregs = [0b101, 0x8001]
+
+        # Put something that looks like a frame header inside the data of the first event
+        self.raws[0][0][100] = 0xe23817fb
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'test.dat')
+        with open(self.path, 'wb') as f:
+            f.write(make_scaler_frame(self.scalers))
+            for i, ((raw1, raw2), tb, ts, cr) in enumerate(zip(self.raws, self.last_tbs,
+                                                                self.timestamps, self.coinregs)):
+                f.write(b'\x00\x00' * 3)  # some padding between frames
+                f.write(make_adc_frame(i + 1, ts, cr, raw1, raw2, tb))
+
+        self.vme = vmedata.VMEFile(self.path)
+
+    def tearDown(self):
+        self.vme.fp.close()
+        self.tmpdir.cleanup()
+
+    def test_iteration(self):
+        evts = list(self.vme)
+        self.assertEqual(len(evts), 3)
+
+        self.assertIsInstance(evts[0], vmedata.ScalerEvent)
+        nptest.assert_equal(evts[0].scalers, self.scalers)
+
+        for i, evt in enumerate(evts[1:]):
+            self.assertIsInstance(evt, vmedata.ADCEvent)
+            self.assertEqual(evt.evt_id, i)
+            self.assertEqual(evt.timestamp, self.timestamps[i])
+            nptest.assert_equal(evt.coincidence_register, [(self.coinregs[i] >> b) & 1 for b in range(16)])
+            nptest.assert_equal(evt.data, expected_adc_data(*self.raws[i], self.last_tbs[i]))
+
+    def test_read_all(self):
+        res = self.vme.read_all()
+        evts = [e for e in self.vme if isinstance(e, vmedata.ADCEvent)]
+
+        self.assertEqual(len(res['evt_id']), len(evts))
+        nptest.assert_equal(res['scalers'], [self.scalers])
+        self.assertEqual(res['data'].dtype, np.uint16)
+        for i, evt in enumerate(evts):
+            self.assertEqual(res['evt_id'][i], evt.evt_id)
+            self.assertEqual(res['timestamp'][i], evt.timestamp)
+            nptest.assert_equal(res['coincidence_register'][i], evt.coincidence_register)
+            nptest.assert_equal(res['data'][i], evt.data)
+
+    def test_read_into(self):
+        out = np.zeros((4, 512), dtype='uint16')
+        self.assertIsInstance(self.vme.read_into(out), vmedata.ScalerEvent)
+
+        evt = self.vme.read_into(out)
+        self.assertIs(evt.data, out)
+        nptest.assert_equal(out, expected_adc_data(*self.raws[0], self.last_tbs[0]))
+
+        self.vme.read_into(out)
+        self.assertRaises(EOFError, self.vme.read_into, out)
+
+    def test_decode_adc_frame(self):
+        with open(self.path, 'rb') as f:
+            buf = f.read()
+        start = len(make_scaler_frame(self.scalers)) + 6 + 4  # skip the padding and the frame's header
+
+        out = np.zeros((4, 512), dtype='uint16')
+        res = vmedata.decode_adc_frame(buf, start, out)
+        self.assertEqual(res, (1, self.timestamps[0], self.coinregs[0], self.last_tbs[0], self.last_tbs[0]))
+        nptest.assert_equal(out, expected_adc_data(*self.raws[0], self.last_tbs[0]))
+
+    @unittest.skipUnless(vmedata.decode_adc_frame is not vmedata._decode_adc_frame,
+                         'the compiled pytpc._vmedata extension is not built')
+    def test_compiled_decode_adc_frame(self):
+        with open(self.path, 'rb') as f:
+            buf = f.read()
+
+        # Decode each ADC frame with both versions and check that they agree
+        frame_end = 0
+        for i in range(len(self.raws)):
+            start = buf.index(b'\xfb\x17\x38\xe2', frame_end) + 4
+            frame_end = start + 12 + 2 * (16 + 2048)  # skip the fake header in the first frame's data
+            out = np.zeros((4, 512), dtype='uint16')
+            py_out = np.zeros((4, 512), dtype='uint16')
+            self.assertEqual(vmedata.decode_adc_frame(buf, start, out),
+                             vmedata._decode_adc_frame(buf, start, py_out))
+            nptest.assert_equal(out, py_out)
+            nptest.assert_equal(out, expected_adc_data(*self.raws[i], self.last_tbs[i]))
+
+        self.assertRaises(ValueError, vmedata.decode_adc_frame, buf, len(buf) - 100, out)
+        self.assertRaises(ValueError, vmedata.decode_adc_frame, buf, start, np.zeros((4, 256), dtype='uint16'))
+
+    def write_file(self, name, data):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return vmedata.VMEFile(path)
+
+    def test_bad_sentinel(self):
+        frame = make_scaler_frame(self.scalers)[:-4] + struct.pack('<I', 0x12345678)
+        vme = self.write_file('bad_sentinel.dat', frame)
+        try:
+            self.assertRaises(vmedata.BadVMEDataError, vme.read_all)
+            self.assertRaises(vmedata.BadVMEDataError, list, vme)
+        finally:
+            vme.fp.close()
+
+    def test_bad_frame_index(self):
+        frame = make_adc_frame(5, self.timestamps[0], self.coinregs[0], *self.raws[0], self.last_tbs[0])
+        vme = self.write_file('bad_index.dat', frame)
+        try:
+            self.assertRaises(vmedata.BadVMEDataError, vme.read_all)
+            self.assertRaises(vmedata.BadVMEDataError, list, vme)
+        finally:
+            vme.fp.close()
+
+    def test_truncated_frame(self):
+        # A scaler frame inside the data of the last ADC frame, which is cut off by the end of the file
+        raw1 = self.raws[1][0].copy()
+        raw1[10:30] = np.frombuffer(make_scaler_frame(self.scalers), dtype='<u4')
+        last_frame = make_adc_frame(1, self.timestamps[1], self.coinregs[1], raw1, self.raws[1][1], self.last_tbs[1])
+        first_frame = make_adc_frame(0, self.timestamps[0], self.coinregs[0], *self.raws[0], self.last_tbs[0])
+        vme = self.write_file('truncated.dat', first_frame + last_frame[:1000])
+        try:
+            evts = list(vme)
+            self.assertEqual(len(evts), 1)
+            self.assertIsInstance(evts[0], vmedata.ADCEvent)
+
+            res = vme.read_all()
+            self.assertEqual(len(res['evt_id']), 1)
+            self.assertEqual(len(res['scalers']), 0)
+            nptest.assert_equal(res['data'][0], evts[0].data)
+        finally:
+            vme.fp.close()
+
+    def test_read_batch(self):
+        res = self.vme.read_all()
+
+        first = self.vme.read_batch(1)
+        self.assertEqual(len(first['evt_id']), 1)
+        nptest.assert_equal(first['scalers'], [self.scalers])
+        nptest.assert_equal(first['data'], res['data'][:1])
+
+        rest = self.vme.read_batch(10)
+        self.assertEqual(len(rest['evt_id']), 1)
+        self.assertEqual(len(rest['scalers']), 0)
+        for key in ('evt_id', 'timestamp', 'coincidence_register', 'data'):
+            nptest.assert_equal(rest[key], res[key][1:])
+
+
+if __name__ == '__main__':
+    unittest.main()
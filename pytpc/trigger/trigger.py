@@ -28,8 +28,8 @@ class TriggerSimulator(object):
     config : dict
         The analysis config dictionary.
     excluded_pads : iterable, optional
-        The set of pads to exclude from the trigger. This is internally converted to a ``set``, so any iterable
-        should work. The default value is the empty list ``[]``.
+        The set of pads to exclude from the trigger. This is internally converted to a ``frozenset``, so any
+        iterable should work. The default value is the empty list ``[]``.
     excluded_cobos : iterable, optional
         A list of CoBos that should be excluded from the trigger, if any. If this is not provided,
         all CoBos will be included in the trigger.
@@ -45,9 +45,13 @@ class TriggerSimulator(object):
         #: The inverse of ``self.padmap``: maps pad number to ``(cobo, asad, aget, channel)``
         self.reverse_padmap = {v: k for k, v in self.padmap.items()}
 
-        #: The set of pads to exclude from the trigger
-        self.badpads = set(excluded_pads if excluded_pads is not None else [])
-        logger.info('%d pads will be excluded from trigger', len(self.badpads))
+        #: ``self.reverse_padmap`` as an array indexed by pad number, for vectorized lookups. Each row is
+        #: ``(cobo, asad, aget, channel)``, or all -1 if the pad is not in the pad map.
+        self.reverse_padmap_arr = np.full((max(self.padmap.values()) + 1, 4), -1, dtype='int16')
+        self.reverse_padmap_arr[list(self.padmap.values())] = list(self.padmap.keys())
+
+        badpads = set(excluded_pads if excluded_pads is not None else [])
+        logger.info('%d pads will be excluded from trigger', len(badpads))
 
         # Exclude pads from excluded CoBos
         if excluded_cobos is not None:
@@ -55,13 +59,19 @@ class TriggerSimulator(object):
             excluded_cobo_pads = set(pad
                                      for (cobo, asad, aget, channel), pad in self.padmap.items()
                                      if cobo in excluded_cobos)
-            self.badpads |= excluded_cobo_pads  # Add these pads to the set with a union operation
+            badpads |= excluded_cobo_pads  # Add these pads to the set with a union operation
             logger.info('CoBos %s will be excluded from trigger. Total excluded pads = %d.',
-                        str(excluded_cobos), len(self.badpads))
+                        str(excluded_cobos), len(badpads))
+
+        #: The set of pads to exclude from the trigger
+        self.badpads = frozenset(badpads)
+
+        #: The pads to exclude from the trigger, as a sorted array
+        self.badpads_arr = np.array(sorted(self.badpads), dtype='uint16')
 
         if pedestals is None:
             pedestals = np.zeros(10240, dtype='float64')
-        self.pedestals = pedestals  #: The pedestal values
+        self.pedestals = np.asarray(pedestals)  #: The pedestal values
 
         self.trigger = MultiplicityTrigger(config, self.reverse_padmap)
 
@@ -82,10 +92,47 @@ class TriggerSimulator(object):
             number, and the value is 1 if hit (0 otherwise).
 
         """
-        # Remove pads in exclusion region
-        non_excluded_pads = set(evt.keys()) - self.badpads
-        evt_for_trigger = {k: evt[k] - self.pedestals[k] for k in non_excluded_pads}
+        # Remove pads in exclusion region and subtract the pedestals
+        badpads = self.badpads
+        pedestals = self.pedestals
+        if badpads:
+            evt_for_trigger = {k: v - pedestals[k] for k, v in evt.items() if k not in badpads}
+        else:
+            evt_for_trigger = {k: v - pedestals[k] for k, v in evt.items()}
+
+        return self._run_trigger(evt_for_trigger)
+
+    def process_event_array(self, pads, traces):
+        """Determine if the given event would trigger the detector.
+
+        This is the same as :meth:`process_event`, but the event is given as arrays. For an
+        :class:`~pytpc.evtdata.Event`, these would be ``evt.traces['pad']`` and ``evt.traces['data']``.
+
+        Parameters
+        ----------
+        pads : array-like
+            The pad number of each trace.
+        traces : np.ndarray
+            The traces, with one row per pad.
+
+        Returns
+        -------
+        did_trig : bool
+            Whether the event would have triggered the detector.
+        hitmask : np.ndarray
+            An array of 10 values showing whether each CoBo was hit. The position in the array is the CoBo
+            number, and the value is 1 if hit (0 otherwise).
+
+        """
+        # Remove pads in exclusion region and subtract the pedestals
+        pads = np.asarray(pads)
+        keep = ~np.isin(pads, self.badpads_arr)
+        pads = pads[keep]
+        traces = np.asarray(traces)[keep] - self.pedestals[pads][:, np.newaxis]
+
+        return self._run_trigger(dict(zip(pads.tolist(), traces)))
 
+    def _run_trigger(self, evt_for_trigger):
         trig, hitmask = self.trigger.find_trigger_signals(evt_for_trigger)
         mult = self.trigger.find_multiplicity_signals(trig)
         did_trig = self.trigger.did_trigger(mult)
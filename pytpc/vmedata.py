@@ -1,16 +1,56 @@
 from __future__ import division, print_function
+import os
 import struct
+import mmap
+import traceback
 import numpy as np
 import h5py
 
 import logging
 logger = logging.getLogger(__name__)
 
+_frame_hdr_struct = struct.Struct('<H')  # event header
+_adc_hdr_struct = struct.Struct('<III')  # event number, timestamp, coincidence register
+_word_struct = struct.Struct('<I')  # a single 32-bit word, like a register or sentinel
+
 
 class BadVMEDataError(Exception):
     pass
 
 
+_unpack_adc = None  # vmedata_kernels.unpack_adc, imported on first use so that Numba is only loaded if it's needed
+
+
+def _decode_adc_frame(buf, start, out):
+    """Decode the body of an ADC frame that starts at offset `start` in `buf`, writing the samples into `out`.
+
+    This is the pure-Python version of :func:`pytpc._vmedata.decode_adc_frame`, which is used instead if
+    the compiled extension is available. It returns the frame index, time stamp, coincidence register, and the
+    last time bucket written in each ADC block.
+    """
+    global _unpack_adc
+    if _unpack_adc is None:
+        from .vmedata_kernels import unpack_adc as _unpack_adc
+
+    # The body is the event header, then a block of 4 registers and 512 raw words for each ADC.
+    # Registers are evt config reg., address counter, evt counter, addr of end of event.
+    # Only the last register is needed.
+    evtnum, timestamp, coinreg = _adc_hdr_struct.unpack_from(buf, start)
+    last_tb1 = _word_struct.unpack_from(buf, start + 24)[0] & 0x1ffff
+    raw1 = np.frombuffer(buf, dtype='<u4', count=512, offset=start + 28)
+    last_tb2 = _word_struct.unpack_from(buf, start + 2088)[0] & 0x1ffff
+    raw2 = np.frombuffer(buf, dtype='<u4', count=512, offset=start + 2092)
+
+    _unpack_adc(raw1, raw2, last_tb1, last_tb2, out)
+    return evtnum, timestamp, coinreg, last_tb1, last_tb2
+
+
+try:
+    from ._vmedata import decode_adc_frame
+except ImportError:
+    decode_adc_frame = _decode_adc_frame
+
+
 class ADCEvent(object):
     def __init__(self, evt_id, timestamp, coincidence_register, data):
         self.evt_id = evt_id
@@ -30,6 +70,12 @@ class ScalerEvent(object):
 
 class VMEFile(object):
 
+    #: The number of bytes to read from the file at a time
+    read_chunk_size = 65536
+
+    #: The number of bytes past the current position that :meth:`read_batch` asks the OS to prefetch
+    prefetch_size = 16 * 2**20
+
     def __init__(self, filename):
         self.fp = open(filename, 'rb')
         self.adc_events_seen = 0
@@ -37,30 +83,91 @@ class VMEFile(object):
 
         self._file_len = self.fp.seek(0, 2)
         self.fp.seek(0)
+        self._reset_buffer()
+
+        # The file is read from start to end, so ask the OS for more aggressive readahead
+        self._advise(0, 0, 'POSIX_FADV_SEQUENTIAL')
 
     def __len__(self):
         """Returns length of file, in bytes."""
         return self._file_len
 
-    def _read(self):
-        # Find the next event
+    def tell(self):
+        """Returns the position of the reader in the file, in bytes.
+
+        Since the file is read in chunks, this can differ from ``self.fp.tell()``.
+        """
+        return self._buf_offset + self._pos
+
+    def _advise(self, offset, length, advice):
+        """Give the OS a hint about how the file will be accessed, if the platform supports it.
+
+        `advice` is the name of one of the ``os.POSIX_FADV_*`` constants.
+        """
+        try:
+            os.posix_fadvise(self.fp.fileno(), offset, length, getattr(os, advice))
+        except (AttributeError, OSError):
+            pass  # posix_fadvise is not available on all platforms, and it's only a hint anyway
+
+    def _reset_buffer(self):
+        self._buf = b''  # Data read from the file that hasn't been parsed yet
+        self._buf_offset = self.fp.tell()  # The offset of the start of the buffer in the file
+        self._pos = 0  # The current position in the buffer
+
+    def _fill(self, n):
+        """Make sure that the buffer holds at least `n` bytes past the current position.
+
+        Returns False if the end of the file is reached first.
+        """
+        avail = len(self._buf) - self._pos
+        if avail >= n:
+            return True
+
+        keep = max(self._pos - 2, 0)  # keep the previous word since it might be the header of the next frame
+        self._buf = self._buf[keep:] + self.fp.read(max(n - avail, self.read_chunk_size))
+        self._buf_offset += keep
+        self._pos -= keep
+        return len(self._buf) - self._pos >= n
+
+    def _take(self, n):
+        """Consume `n` bytes from the buffer and return the position where they start."""
+        if not self._fill(n):
+            raise EOFError('Reached end of VME file')
+        start = self._pos
+        self._pos += n
+        return start
+
+    def _find_magic(self):
+        """Advance past the next magic word and return its position in the buffer."""
         while True:
-            raw_magic = self.fp.read(2)
-            if raw_magic == b'':
-                raise EOFError('Reached end of VME file')
-            magic = struct.unpack('<H', raw_magic)[0]
-            if magic == 0xe238:
-                break
+            idx = self._buf.find(b'\x38\xe2', self._pos)
+            if idx == -1:
+                # Keep the last byte since it could be the first half of the magic word
+                self._pos = max(self._pos, len(self._buf) - 1)
+                if not self._fill(len(self._buf) - self._pos + 1):
+                    raise EOFError('Reached end of VME file')
+            elif (self._buf_offset + idx) % 2 != 0:
+                self._pos = idx + 1  # The magic word is always aligned to a 16-bit word
+            else:
+                self._pos = idx + 2
+                return idx
+
+    def _read(self, out=None):
+        # Find the next event
+        magic_idx = self._find_magic()
+        if magic_idx < 2:
+            raise IOError('Found magic word at start of file with no header')
 
-        self.fp.seek(-4, 1)  # rewind to previous word, which identifies event type and length
-        evthdr, magic = struct.unpack('<HH', self.fp.read(4))
-        assert magic == 0xe238, 'magic is now wrong. Out of alignment?'
+        # The previous word identifies event type and length. The magic word itself was already matched
+        # by _find_magic, so there's no need to check it again.
+        evthdr = _frame_hdr_struct.unpack_from(self._buf, magic_idx - 2)[0]
 
         if evthdr == 0x2025:
             # This is a scalar event
             self.scaler_events_seen += 1
-            scalers = np.fromfile(self.fp, dtype='<I', count=18)
-            sentinel = struct.unpack('<I', self.fp.read(4))[0]
+            start = self._take(76)
+            scalers = np.frombuffer(self._buf, dtype='<u4', count=18, offset=start).copy()
+            sentinel = _word_struct.unpack_from(self._buf, start + 72)[0]
             if sentinel != 0xffffffff:
                 raise BadVMEDataError(f'Invalid sentinel value {sentinel:x} at end of scaler frame')
             return ScalerEvent(
@@ -70,14 +177,9 @@ class VMEFile(object):
 
         elif evthdr == 0x17fb:
             # evtlen = evthdr & 0xfff
-            evtnum, timestamp, coinreg = struct.unpack('<III', self.fp.read(12))
-
-            # Registers are evt config reg., address counter, evt counter, addr of end of event
-            reg1 = np.fromfile(self.fp, dtype='<I', count=4)
-            raw1 = np.fromfile(self.fp, dtype='<I', count=512)
-
-            reg2 = np.fromfile(self.fp, dtype='<I', count=4)
-            raw2 = np.fromfile(self.fp, dtype='<I', count=512)
+            start = self._take(12 + 2 * (16 + 2048))
+            adc_data = out if out is not None else np.empty((4, 512), dtype='uint16')
+            evtnum, timestamp, coinreg, last_tb1, last_tb2 = decode_adc_frame(self._buf, start, adc_data)
 
             self.adc_events_seen += 1
             true_evtnum = evtnum - self.scaler_events_seen  # evt num is incremented even for a scaler buffer
@@ -86,21 +188,10 @@ class VMEFile(object):
             if (evtnum != self.adc_events_seen + self.scaler_events_seen - 1):
                 raise BadVMEDataError(f'Frame index is inconsistent at frame index {evtnum:x}')
 
-            last_tb1 = reg1[3] & 0x1ffff
-            last_tb2 = reg2[3] & 0x1ffff
             if last_tb1 != last_tb2:
                 logger.warning('Last TBs do not match for event %d (frame 0x%x): %d != %d',
                                true_evtnum, evtnum, last_tb1, last_tb2)
 
-            raw1 = np.roll(raw1, -last_tb1, axis=-1)
-            raw2 = np.roll(raw2, -last_tb2, axis=-1)
-
-            adc_data = np.zeros((4, 512), dtype='int32')
-            adc_data[0] = (raw1 & 0x1fff0000) >> 16
-            adc_data[1] = (raw1 & 0x1fff)
-            adc_data[2] = (raw2 & 0x1fff0000) >> 16
-            adc_data[3] = (raw2 & 0x1fff)
-
             return ADCEvent(
                 evt_id=true_evtnum,
                 timestamp=timestamp,
@@ -112,6 +203,7 @@ class VMEFile(object):
 
     def __iter__(self):
         self.fp.seek(0)
+        self._reset_buffer()
         self.scaler_events_seen = 0
         self.adc_events_seen = 0
         return self
@@ -126,6 +218,223 @@ class VMEFile(object):
             except IOError:
                 continue
 
+    def read_into(self, out):
+        """Read the next event, writing its ADC data into the given array.
+
+        This works like ``next(self)``, except that the data of an ADC event is written into `out` rather than
+        into a newly allocated array. Reusing the same array for each event avoids allocating memory for every
+        event, but note that the data from the previous event will be overwritten.
+
+        Parameters
+        ----------
+        out : np.ndarray
+            A uint16 array of shape ``(4, 512)``.
+
+        Returns
+        -------
+        ADCEvent or ScalerEvent
+            The event. If it is an ``ADCEvent``, its ``data`` attribute is `out`.
+
+        Raises
+        ------
+        EOFError
+            If the end of the file was reached.
+
+        """
+        while True:
+            try:
+                return self._read(out=out)
+            except IOError:
+                continue
+
+    def read_batch(self, n):
+        """Read the next `n` ADC events from the file into arrays.
+
+        This continues from the current position in the file, so it can be called repeatedly to process the
+        file in chunks.
+
+        Parameters
+        ----------
+        n : int
+            The maximum number of ADC events to read.
+
+        Returns
+        -------
+        dict
+            A dictionary of arrays with the same keys as the result of :meth:`read_all`. If the end of the file
+            is reached, this will contain fewer than `n` events. Any scaler frames that were found between the
+            ADC events are included under the key ``'scalers'``.
+
+        """
+        self._advise(self.fp.tell(), self.prefetch_size, 'POSIX_FADV_WILLNEED')
+
+        result = _empty_batch(n, 0)
+        scalers = []
+
+        count = 0
+        while count < n:
+            try:
+                evt = self.read_into(result['data'][count])
+            except EOFError:
+                break
+
+            if isinstance(evt, ScalerEvent):
+                scalers.append(evt.scalers)
+            else:
+                result['evt_id'][count] = evt.evt_id
+                result['timestamp'][count] = evt.timestamp
+                result['coincidence_register'][count] = evt.coincidence_register
+                count += 1
+
+        for key in ('evt_id', 'timestamp', 'coincidence_register', 'data'):
+            result[key] = result[key][:count]
+        result['scalers'] = np.array(scalers, dtype='uint32').reshape(-1, 18)
+
+        return result
+
+    def read_all(self):
+        """Read all of the events in the file at once.
+
+        Rather than parsing the file one frame at a time like iterating over this object does, this memory-maps
+        the file, finds the frame headers with a vectorized search, and gathers the data from every frame into
+        a few large arrays. This does not change the position of the file pointer used for iteration.
+
+        Returns
+        -------
+        dict
+            A dictionary of arrays. The ADC events are described by the keys ``'evt_id'``, ``'timestamp'``,
+            ``'coincidence_register'`` (a boolean array of shape ``(n, 16)``), and ``'data'`` (shape
+            ``(n, 4, 512)``), with one row per ADC event. These have the same meaning as the attributes of
+            :class:`ADCEvent`. The key ``'scalers'`` holds the scaler frames in an array of shape ``(m, 18)``.
+
+        Raises
+        ------
+        BadVMEDataError
+            If a scaler frame has a bad sentinel or an ADC frame's index is inconsistent.
+
+        """
+        if self._file_len < 4:
+            return _empty_batch(0, 0)
+
+        mm = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            words = np.frombuffer(mm, dtype='<u2', count=len(mm) // 2)
+            try:
+                return _parse_frames(words)
+            except Exception as e:
+                # The traceback holds on to the local variables of _parse_frames, some of which are views of
+                # the map. Clear them, or closing the map would fail and hide this exception.
+                traceback.clear_frames(e.__traceback__)
+                raise
+            finally:
+                del words  # release the buffer so the map can be closed
+        finally:
+            mm.close()
+
+
+_adc_frame_words = 2 + 6 + 8 + 1024 + 8 + 1024  #: Length of an ADC frame, in 16-bit words
+_scaler_frame_words = 2 + 36 + 2  #: Length of a scaler frame, in 16-bit words
+_parse_chunk_events = 4096  #: Number of ADC events to unpack at a time in read_all
+
+
+def _empty_batch(num_adc, num_scaler):
+    return {
+        'evt_id': np.empty(num_adc, dtype='int64'),
+        'timestamp': np.empty(num_adc, dtype='uint32'),
+        'coincidence_register': np.empty((num_adc, 16), dtype=bool),
+        'data': np.empty((num_adc, 4, 512), dtype='uint16'),
+        'scalers': np.empty((num_scaler, 18), dtype='uint32'),
+    }
+
+
+def _u32_rows(words, length):
+    """View an array of 16-bit words as rows of `length` little-endian 32-bit words.
+
+    Row ``i`` holds the 32-bit words starting at ``words[i]``. The rows overlap, and most of them aren't
+    aligned to 4 bytes, but this is only a view, so indexing it copies just the rows that are selected.
+    """
+    return np.ndarray(shape=(max(len(words) - 2 * length + 1, 0), length), dtype='<u4',
+                      buffer=words, strides=(2, 4))
+
+
+def _parse_frames(words):
+    """Find and decode all of the frames in a VME file, given as an array of 16-bit words."""
+    from .vmedata_kernels import unpack_adc_batch  # imported here so that Numba is only loaded if it's needed
+
+    # Candidate frames are places where the magic word is preceded by a known header
+    magic_idx = np.flatnonzero(words[1:] == 0xe238) + 1
+    hdrs = words[magic_idx - 1]
+    valid = (hdrs == 0x17fb) | (hdrs == 0x2025)
+    magic_idx = magic_idx[valid]
+    hdrs = hdrs[valid]
+
+    frame_ends = magic_idx - 1 + np.where(hdrs == 0x17fb, _adc_frame_words, _scaler_frame_words)
+
+    # The data inside a frame can look like a header. Reading sequentially skips over the body of each
+    # frame, so do the same here by dropping candidates that start inside the previous frame.
+    if np.any(magic_idx[1:] < frame_ends[:-1]):
+        keep = np.zeros(len(magic_idx), dtype=bool)
+        end = 0
+        for i, (m, e) in enumerate(zip(magic_idx.tolist(), frame_ends.tolist())):
+            if m >= end:
+                keep[i] = True
+                end = e
+        magic_idx, hdrs, frame_ends = magic_idx[keep], hdrs[keep], frame_ends[keep]
+
+    # Reading sequentially stops at the first frame that is cut off by the end of the file
+    incomplete = np.flatnonzero(frame_ends > len(words))
+    if len(incomplete) > 0:
+        magic_idx, hdrs = magic_idx[:incomplete[0]], hdrs[:incomplete[0]]
+
+    is_adc = hdrs == 0x17fb
+    adc_magic = magic_idx[is_adc]
+    scaler_magic = magic_idx[~is_adc]
+
+    scaler_block = _u32_rows(words, 19)[scaler_magic + 1]
+    bad_sentinel = np.flatnonzero(scaler_block[:, 18] != 0xffffffff)
+    if len(bad_sentinel) > 0:
+        sentinel = scaler_block[bad_sentinel[0], 18]
+        raise BadVMEDataError(f'Invalid sentinel value {sentinel:x} at end of scaler frame')
+
+    hdr_vals = _u32_rows(words, 3)[adc_magic + 1]
+    evtnum, timestamp, coinreg = hdr_vals.T
+
+    # The frame index counts both kinds of frames, and the event number is incremented even for scaler frames
+    frame_idx = np.flatnonzero(is_adc)
+    num_scalers_before = frame_idx - np.arange(len(frame_idx))
+    bad_idx = np.flatnonzero(evtnum != frame_idx)
+    if len(bad_idx) > 0:
+        raise BadVMEDataError(f'Frame index is inconsistent at frame index {evtnum[bad_idx[0]]:x}')
+    true_evtnum = evtnum.astype('int64') - num_scalers_before
+
+    reg1_start = adc_magic + 7
+    raw1_start = reg1_start + 8
+    reg2_start = raw1_start + 1024
+    raw2_start = reg2_start + 8
+
+    single_words = _u32_rows(words, 1)[:, 0]
+    last_tb1 = (single_words[reg1_start + 6] & 0x1ffff).astype('int64')
+    last_tb2 = (single_words[reg2_start + 6] & 0x1ffff).astype('int64')
+    for i in np.flatnonzero(last_tb1 != last_tb2):
+        logger.warning('Last TBs do not match for event %d (frame 0x%x): %d != %d',
+                       true_evtnum[i], evtnum[i], last_tb1[i], last_tb2[i])
+
+    result = _empty_batch(len(adc_magic), len(scaler_magic))
+    result['evt_id'][:] = true_evtnum
+    result['timestamp'][:] = timestamp
+    result['coincidence_register'][:] = (coinreg[:, None] & (1 << np.arange(16, dtype='uint32'))) > 0
+    result['scalers'][:] = scaler_block[:, :18]
+
+    # Copy the raw words out of the file a chunk of events at a time, so that only the unpacked data
+    # needs to be held in memory for the whole file
+    raw_blocks = _u32_rows(words, 512)
+    for begin in range(0, len(adc_magic), _parse_chunk_events):
+        chunk = slice(begin, begin + _parse_chunk_events)
+        unpack_adc_batch(raw_blocks[raw1_start[chunk]], raw_blocks[raw2_start[chunk]],
+                         last_tb1[chunk], last_tb2[chunk], result['data'][chunk])
+
+    return result
+
 
 class VMEAlignmentTable:
     """A table that maps VME event IDs to GET electronics event IDs.
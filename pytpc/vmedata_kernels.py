@@ -0,0 +1,133 @@
+"""vmedata_kernels.py
+
+Compiled kernels for unpacking the ADC data in VME files. These are used by :mod:`pytpc.vmedata`.
+
+If Numba is available, the kernels are compiled with Numba. They are given explicit signatures, so they are compiled
+(or loaded from Numba's on-disk cache) once when this module is imported, rather than on the first call with each new
+combination of argument types. The batch kernel is parallelized over events using Numba's threading layer. If Numba
+is not available, equivalent NumPy implementations are used.
+
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange, types as nbtypes
+except ImportError:
+    njit = None
+
+from itertools import product
+
+__all__ = ['unpack_adc', 'unpack_adc_batch', 'split_adc_words']
+
+
+def split_adc_words(raw, hi, lo):
+    """Split raw 32-bit ADC words into the two 13-bit samples that they contain.
+
+    The results are written in place into `hi` and `lo`, so no temporary arrays are created.
+
+    Parameters
+    ----------
+    raw : ndarray
+        The raw words.
+    hi, lo : ndarray
+        Arrays with the same shape as `raw` to write the samples from the upper and lower half-words into.
+
+    """
+    np.right_shift(raw, 16, out=hi, casting='unsafe')
+    np.bitwise_and(hi, 0x1fff, out=hi)
+    np.bitwise_and(raw, 0x1fff, out=lo, casting='unsafe')
+
+
+def _unpack_adc_loop(raw1, raw2, last_tb1, last_tb2, out):
+    """Unpack the raw words from the two ADC blocks into four channels of samples.
+
+    Each 32-bit raw word holds two 13-bit samples, one in each half-word. The samples are also
+    rotated so that the sample after the last time bucket written by the ADC comes first.
+
+    Parameters
+    ----------
+    raw1, raw2 : ndarray
+        The raw 32-bit words from the first and second ADC blocks.
+    last_tb1, last_tb2 : int
+        The last time bucket written in each block, from the block's address-of-end-of-event register.
+    out : ndarray
+        A C-contiguous uint16 array of shape ``(4, len(raw1))`` to write the samples into.
+
+    Returns
+    -------
+    ndarray
+        The array `out`.
+
+    """
+    n = raw1.shape[0]
+    for i in range(n):
+        r1 = raw1[(i + last_tb1) % n]
+        r2 = raw2[(i + last_tb2) % n]
+        out[0, i] = (r1 >> 16) & 0x1fff
+        out[1, i] = r1 & 0x1fff
+        out[2, i] = (r2 >> 16) & 0x1fff
+        out[3, i] = r2 & 0x1fff
+    return out
+
+
+def _unpack_adc_numpy(raw1, raw2, last_tb1, last_tb2, out):
+    """NumPy version of :func:`unpack_adc`, used if Numba is not installed."""
+    split_adc_words(np.roll(raw1, -int(last_tb1)), out[0], out[1])
+    split_adc_words(np.roll(raw2, -int(last_tb2)), out[2], out[3])
+    return out
+
+
+def _unpack_adc_batch_loop(raw1, raw2, last_tb1, last_tb2, out):
+    """Unpack the raw ADC blocks from many events at once.
+
+    This is the same as calling :func:`unpack_adc` on each event, but the events are processed in parallel.
+
+    Parameters
+    ----------
+    raw1, raw2 : ndarray
+        The raw 32-bit words from the first and second ADC blocks of each event, with shape ``(n, 512)``.
+    last_tb1, last_tb2 : ndarray
+        The last time bucket written in each block, as int64 arrays of length ``n``.
+    out : ndarray
+        A C-contiguous uint16 array of shape ``(n, 4, 512)`` to write the samples into.
+
+    Returns
+    -------
+    ndarray
+        The array `out`.
+
+    """
+    for e in prange(raw1.shape[0]):
+        unpack_adc(raw1[e], raw2[e], last_tb1[e], last_tb2[e], out[e])
+    return out
+
+
+def _unpack_adc_batch_numpy(raw1, raw2, last_tb1, last_tb2, out):
+    """NumPy version of :func:`unpack_adc_batch`, used if Numba is not installed."""
+    rows = np.arange(raw1.shape[0])[:, np.newaxis]
+    samples = np.arange(raw1.shape[1])
+    split_adc_words(raw1[rows, (samples + last_tb1[:, np.newaxis]) % raw1.shape[1]], out[:, 0], out[:, 1])
+    split_adc_words(raw2[rows, (samples + last_tb2[:, np.newaxis]) % raw2.shape[1]], out[:, 2], out[:, 3])
+    return out
+
+
+if njit is not None:
+    # Raw blocks read with np.frombuffer from a bytes object are read-only, so accept both kinds of array
+    _raw_types = [nbtypes.Array(nbtypes.uint32, 1, 'C', readonly=ro) for ro in (True, False)]
+    _adc_type = nbtypes.Array(nbtypes.uint16, 2, 'C')
+    _unpack_adc_sigs = [_adc_type(r1, r2, nbtypes.int64, nbtypes.int64, _adc_type)
+                        for r1, r2 in product(_raw_types, repeat=2)]
+
+    unpack_adc = njit(_unpack_adc_sigs, cache=True)(_unpack_adc_loop)
+
+    _raw_batch_types = [nbtypes.Array(nbtypes.uint32, 2, 'C', readonly=ro) for ro in (True, False)]
+    _tb_batch_type = nbtypes.Array(nbtypes.int64, 1, 'C')
+    _adc_batch_type = nbtypes.Array(nbtypes.uint16, 3, 'C')
+    _unpack_adc_batch_sigs = [_adc_batch_type(r1, r2, _tb_batch_type, _tb_batch_type, _adc_batch_type)
+                              for r1, r2 in product(_raw_batch_types, repeat=2)]
+
+    unpack_adc_batch = njit(_unpack_adc_batch_sigs, parallel=True, cache=True)(_unpack_adc_batch_loop)
+else:
+    unpack_adc = _unpack_adc_numpy
+    unpack_adc_batch = _unpack_adc_batch_numpy
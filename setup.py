@@ -90,7 +90,13 @@ multiplicity_ext = make_extension(
     language='c',
 )
 
-all_extensions = [fitter_ext, armadillo_ext, cleaner_ext, multiplicity_ext]
+vmedata_ext = make_extension(
+    module='pytpc._vmedata',
+    sources=['pytpc/_vmedata.pyx'],
+    language='c',
+)
+
+all_extensions = [fitter_ext, armadillo_ext, cleaner_ext, multiplicity_ext, vmedata_ext]
 
 setup(
     name='pytpc',
@@ -115,15 +121,17 @@ setup(
         'bin/unpack_vme',
         'bin/select_vme',
     ],
+    python_requires='>=3.8',
     install_requires=[
         'scipy',
-        'numpy',
+        'numpy>=1.20',
+        'numba>=0.55',
         'pandas',
         'h5py',
         'tables',
         'sqlalchemy',
         'pyyaml',
-        'Cython',
+        'Cython>=0.29.31',
     ],
     package_data={'pytpc': ['data/gases/*', 'data/raw/*', 'fitting/*.pxd']},
     extras_require={